@@ -1,4 +1,4 @@
-from itertools import combinations
+import functools
 
 import matplotlib.pyplot as plt
 import networkx as nx
@@ -9,6 +9,137 @@ from ldpc import mod2
 import util
 
 
+def _normalize_noise(value: float | list[float], num_params: int, name: str) -> tuple[float, ...]:
+    """Normalizes a scalar noise strength or per-channel list into a hashable tuple."""
+
+    if isinstance(value, (int, float, np.number)):
+        return (float(value) / num_params,) * num_params
+    assert (
+        len(value) == num_params
+    ), f"{name} noise takes {num_params} parameters, given {len(value)}."
+    return tuple(value)
+
+
+@functools.lru_cache(maxsize=32)
+def _surface_code_layout(scale: tuple[int, int]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Splits the qubit grid of a surface code into data, Z check, and X check qubits.
+
+    Returns `int32` index arrays in row-major grid order.
+    """
+
+    rows, cols = np.meshgrid(np.arange(scale[0]), np.arange(scale[1]), indexing="ij")
+    qubit = rows * scale[1] + cols
+
+    data_mask = ((rows % 2 == 0) & (cols % 2 == 0)) | ((rows % 2 != 0) & (cols % 2 != 0))
+    z_mask = (rows % 2 == 0) & (cols % 2 != 0)
+    x_mask = (rows % 2 != 0) & (cols % 2 == 0)
+
+    layout = (
+        qubit[data_mask].astype(np.int32),
+        qubit[z_mask].astype(np.int32),
+        qubit[x_mask].astype(np.int32),
+    )
+    # The cached arrays are shared by every model at this scale, so freeze them: an
+    # in-place mutation through one instance must not corrupt the cache for the rest.
+    for arr in layout:
+        arr.setflags(write=False)
+
+    return layout
+
+
+@functools.lru_cache(maxsize=32)
+def _build_surface_layer(
+    scale: tuple[int, int],
+    noise_circuit: tuple[float, ...] | None,
+    noise_data: tuple[float, ...] | None,
+    noise_z_check: tuple[float, ...] | None,
+    noise_x_check: tuple[float, ...] | None,
+    experiment: str | None,
+) -> stim.Circuit:
+    """Builds the noisy stabilizer-measurement layer repeated every surface-code round.
+
+    Cached so that parameter sweeps which instantiate many models with the same scale and
+    noise reuse the compiled layer template instead of re-running the schedule loops.
+    """
+
+    data_qubits, z_check_qubits, x_check_qubits = _surface_code_layout(scale)
+
+    circuit = stim.Circuit()
+
+    # Collect the targets for each gate type and emit one append per layer; the Z and
+    # X extraction circuits act on commuting stabilizers, so batching by type keeps
+    # the measured syndromes unchanged while avoiding per-pair append calls.
+    z_cnot_targets: list[int] = []
+    x_cnot_targets: list[int] = []
+    x_noise_targets: list[int] = []
+    for row in range(scale[0]):
+        for col in range(scale[1]):
+            curr_qubit = row * scale[1] + col
+            if row % 2 == 0 and col % 2 != 0:
+                # Z check and boundary conditions.
+                z_cnot_targets += [curr_qubit - 1, curr_qubit, curr_qubit + 1, curr_qubit]
+                if row != 0:
+                    z_cnot_targets += [curr_qubit - scale[1], curr_qubit]
+                if row != scale[0] - 1:
+                    z_cnot_targets += [curr_qubit + scale[1], curr_qubit]
+            elif row % 2 != 0 and col % 2 == 0:
+                # X check and boundary conditions.
+                x_cnot_targets += [curr_qubit, curr_qubit - scale[1]]
+                x_cnot_targets += [curr_qubit, curr_qubit + scale[1]]
+                x_noise_targets += [curr_qubit - scale[1], curr_qubit]
+                x_noise_targets += [curr_qubit + scale[1], curr_qubit]
+                if col != 0:
+                    x_cnot_targets += [curr_qubit, curr_qubit - 1]
+                    x_noise_targets += [curr_qubit - 1, curr_qubit]
+                if col != scale[1] - 1:
+                    x_cnot_targets += [curr_qubit, curr_qubit + 1]
+                    x_noise_targets += [curr_qubit + 1, curr_qubit]
+
+    circuit.append("CNOT", z_cnot_targets)
+    if noise_circuit is not None:
+        circuit.append("PAULI_CHANNEL_2", z_cnot_targets, noise_circuit)
+
+    circuit.append("H", x_check_qubits)
+    circuit.append("CNOT", x_cnot_targets)
+    circuit.append("H", x_check_qubits)
+    if noise_circuit is not None:
+        circuit.append("PAULI_CHANNEL_2", x_noise_targets, noise_circuit)
+
+    if noise_data is not None:
+        circuit.append("PAULI_CHANNEL_1", data_qubits, noise_data)
+    if noise_z_check is not None:
+        circuit.append("PAULI_CHANNEL_1", z_check_qubits, noise_z_check)
+    if noise_x_check is not None:
+        circuit.append("PAULI_CHANNEL_1", x_check_qubits, noise_x_check)
+
+    # Local bindings keep the detector loops from re-resolving bound methods and the
+    # stim module attribute on every iteration.
+    append = circuit.append
+    trec = stim.target_rec
+    num_checks = len(z_check_qubits) + len(x_check_qubits)
+
+    append("MR", z_check_qubits)
+    if experiment == "z_memory":
+        for k in range(len(z_check_qubits)):
+            append("DETECTOR", [trec(-1 - k), trec(-1 - k - num_checks)])
+        append("MR", x_check_qubits)
+    elif experiment == "x_memory":
+        append("MR", x_check_qubits)
+        for k in range(len(x_check_qubits)):
+            append("DETECTOR", [trec(-1 - k), trec(-1 - k - num_checks)])
+    elif experiment is None:
+        for k in range(len(z_check_qubits)):
+            append("DETECTOR", [trec(-1 - k), trec(-1 - k - num_checks)])
+
+        append("MR", x_check_qubits)
+        for k in range(len(x_check_qubits)):
+            append("DETECTOR", [trec(-1 - k), trec(-1 - k - num_checks)])
+    else:
+        raise ValueError(f"Experiment not recognized: '{experiment}'.")
+
+    return circuit
+
+
 class StabilizerModel:
     def __init__(
         self,
@@ -26,6 +157,11 @@ class StabilizerModel:
         self.circuit = stim.Circuit() if circuit is None else circuit
         self.rounds = rounds
 
+        # Compiled samplers are built lazily and reused; any method that mutates
+        # self.circuit afterwards must reset these to None.
+        self._sampler = None
+        self._detector_sampler = None
+
         self.qubits = []
         self.data_qubits = []
         self.z_check_qubits = []
@@ -34,137 +170,145 @@ class StabilizerModel:
         # Currently only supported for HP codes.
         self.graph = None
 
-        if np.issubdtype(type(noise_circuit), np.number):
-            self.noise_circuit = [noise_circuit / 15 for _ in range(15)]
-        else:
-            assert (
-                len(noise_circuit) == 15
-            ), f"Stabilizer measurement noise takes 15 parameters, given {len(noise_circuit)}."
-            self.noise_circuit = noise_circuit
+        # Stored as tuples so they can key the cached surface-layer template. This also
+        # fixes the crossing-noise branch, which previously overwrote noise_circuit.
+        self.noise_circuit = _normalize_noise(noise_circuit, 15, "Stabilizer measurement")
+        self.noise_data = _normalize_noise(noise_data, 3, "Data qubit")
+        self.noise_crossing = _normalize_noise(noise_crossing, 15, "Crossing")
+        self.noise_z_check = _normalize_noise(noise_z_check, 3, "Z check qubit")
+        self.noise_x_check = _normalize_noise(noise_x_check, 3, "X check qubit")
 
-        if np.issubdtype(type(noise_data), np.number):
-            self.noise_data = [noise_data / 3 for _ in range(3)]
-        else:
-            assert (
-                len(noise_data) == 3
-            ), f"Data qubit noise takes 3 parameters, given {len(noise_data)}."
-            self.noise_data = noise_data
+        self.logical = logical
 
-        if np.issubdtype(type(noise_crossing), np.number):
-            self.noise_crossing = [noise_crossing / 15 for _ in range(15)]
-        else:
-            assert (
-                len(noise_crossing) == 15
-            ), f"Crossing noise takes 15 parameters, given {len(noise_crossing)}."
-            self.noise_circuit = noise_crossing
+        self.code_params: dict = kwargs
+        main_code, experiment = code.split(":") if ":" in code else (code, None)
+        setup = self._CODE_BUILDERS.get(main_code)
+        if setup is None:
+            raise ValueError(f"Code not recognized: '{main_code}'.")
+        setup(self, experiment)
 
-        if np.issubdtype(type(noise_z_check), np.number):
-            self.noise_z_check = [noise_z_check / 3 for _ in range(3)]
-        else:
-            assert (
-                len(noise_z_check) == 3
-            ), f"Z check qubit noise takes 3 parameters, given {len(noise_z_check)}."
-            self.noise_z_check = noise_z_check
+        # TODO: Implement X and Z error propagation analysis.
+        # TODO: Implement single-gate noise, like for Hadamard gates in X stabilizer syndrome extraction.
 
-        if np.issubdtype(type(noise_x_check), np.number):
-            self.noise_x_check = [noise_x_check / 3 for _ in range(3)]
-        else:
-            assert (
-                len(noise_x_check) == 3
-            ), f"Data qubit noise takes 3 parameters, given {len(noise_z_check)}."
-            self.noise_x_check = noise_x_check
+    def _setup_repetition_code(self, experiment: str | None) -> None:
+        self.distance = self.code_params["distance"]
 
-        self.logical = logical
+        self.qubits = np.arange(2 * self.distance + 1, dtype=np.int32)
+        self.data_qubits = self.qubits[::2]
+        self.z_check_qubits = self.qubits[1::2]
+        self._repetition_code()
 
-        self.code_params: dict = kwargs
-        main_code, experiment = code.split(":") if ":" in code else (code, None)
-        match main_code:
-            case "repetition_code":
-                self.distance = self.code_params["distance"]
-
-                self.qubits = np.arange(2 * self.distance + 1)
-                self.data_qubits = self.qubits[::2]
-                self.z_check_qubits = self.qubits[1::2]
-                self._repetition_code()
-            case "surface_code":
-                self.scale = self.code_params["scale"]
-                assert (
-                    self.scale[0] % 2 != 0 and self.scale[1] % 2 != 0
-                ), "Scale of the surface code must be odd."
-
-                self.qubits = np.arange(self.scale[0] * self.scale[1])
-                self.data_qubits = []
-                self.x_check_qubits = []
-                self.z_check_qubits = []
-                for row in range(self.scale[0]):
-                    for col in range(self.scale[1]):
-                        curr_qubit = row * self.scale[1] + col
-                        self.circuit.append("QUBIT_COORDS", [curr_qubit], [row, col])
-                        if row % 2 == 0:
-                            if col % 2 == 0:
-                                self.data_qubits.append(curr_qubit)
-                            else:
-                                self.z_check_qubits.append(curr_qubit)
-                        elif row % 2 != 0:
-                            if col % 2 != 0:
-                                self.data_qubits.append(curr_qubit)
-                            else:
-                                self.x_check_qubits.append(curr_qubit)
-                self._surface_code(experiment)
-            case "hypergraph_product_code":
-                self.pos: list[tuple[int, int]] = (
-                    None if "pos" not in self.code_params.keys() else self.code_params["pos"]
-                )
+    def _setup_surface_code(self, experiment: str | None) -> None:
+        self.scale = tuple(self.code_params["scale"])
+        assert (
+            self.scale[0] % 2 != 0 and self.scale[1] % 2 != 0
+        ), "Scale of the surface code must be odd."
 
-                clist1 = self.code_params["clist1"]
-                clist2 = self.code_params["clist2"]
+        self.qubits = np.arange(self.scale[0] * self.scale[1], dtype=np.int32)
+        # QUBIT_COORDS carries per-instruction arguments, so it cannot be
+        # flattened into one append.
+        for curr_qubit in self.qubits:
+            self.circuit.append(
+                "QUBIT_COORDS",
+                [curr_qubit],
+                [curr_qubit // self.scale[1], curr_qubit % self.scale[1]],
+            )
 
-                self.H1: np.ndarray = util.classical_pcm(clist1)
-                self.H2: np.ndarray = util.classical_pcm(clist2)
+        self.data_qubits, self.z_check_qubits, self.x_check_qubits = _surface_code_layout(
+            self.scale
+        )
+        self._surface_code(experiment)
 
-                num_qubits = sum(self.H1.shape) * sum(self.H2.shape)
-                self.qubits = np.arange(num_qubits)
+    def _setup_hypergraph_product_code(self, experiment: str | None) -> None:
+        self.pos: list[tuple[int, int]] = (
+            None if "pos" not in self.code_params.keys() else self.code_params["pos"]
+        )
 
-                z_check_order = [
-                    "Q" if s == "B" else "Z"
-                    for s in clist2
-                    if not np.issubdtype(type(s), np.number)
-                ]
+        clist1 = self.code_params["clist1"]
+        clist2 = self.code_params["clist2"]
 
-                x_check_order = [
-                    "X" if s == "B" else "Q"
-                    for s in clist2
-                    if not np.issubdtype(type(s), np.number)
-                ]
+        self.H1: np.ndarray = util.classical_pcm(clist1)
+        self.H2: np.ndarray = util.classical_pcm(clist2)
 
-                check_order = np.array(
-                    [
-                        z_check_order if s == "B" else x_check_order
-                        for s in clist1
-                        if not np.issubdtype(type(s), np.number)
-                    ]
-                ).flatten()
-
-                self.data_qubits = [q for q, s in zip(self.qubits, check_order) if s == "Q"]
-                self.z_check_qubits = [q for q, s in zip(self.qubits, check_order) if s == "Z"]
-                self.x_check_qubits = [q for q, s in zip(self.qubits, check_order) if s == "X"]
-
-                self.HX, self.HZ = util.hypergraph_pcm(self.H1, self.H2)
-                self.graph = self.construct_graph()
-                if self.pos is None or type(self.pos) == str:
-                    self.pos_from_str()
-
-                self._hypergraph_product_code(experiment)
-            case _:
-                raise ValueError(f"Code not recognized: '{main_code}'.")
+        num_qubits = sum(self.H1.shape) * sum(self.H2.shape)
+        self.qubits = np.arange(num_qubits, dtype=np.int32)
 
-        # TODO: Implement X and Z error propagation analysis.
-        # TODO: Implement single-gate noise, like for Hadamard gates in X stabilizer syndrome extraction.
+        # Filter the symbol markers once; isinstance is a single C-level type
+        # check, unlike np.issubdtype on every element.
+        clist1_symbols = [s for s in clist1 if isinstance(s, str)]
+        clist2_symbols = [s for s in clist2 if isinstance(s, str)]
+
+        z_check_order = ["Q" if s == "B" else "Z" for s in clist2_symbols]
+        x_check_order = ["X" if s == "B" else "Q" for s in clist2_symbols]
+
+        check_order = np.array(
+            [z_check_order if s == "B" else x_check_order for s in clist1_symbols]
+        ).flatten()
+
+        self.data_qubits = self.qubits[check_order == "Q"]
+        self.z_check_qubits = self.qubits[check_order == "Z"]
+        self.x_check_qubits = self.qubits[check_order == "X"]
+
+        self.HX, self.HZ = util.hypergraph_pcm(self.H1, self.H2)
+
+        # Bit-packed rows for fast syndrome/weight kernels; the dense forms above
+        # stay around for display and graph construction.
+        self.HX_packed = util.pack_pcm(self.HX)
+        self.HZ_packed = util.pack_pcm(self.HZ)
+        self.graph = self.construct_graph()
+        if self.pos is None or type(self.pos) == str:
+            self.pos_from_str()
+
+        self._hypergraph_product_code(experiment)
+
+    # Dispatch table for __init__; resolved once at class-definition time instead of a
+    # string match on every instantiation.
+    _CODE_BUILDERS = {
+        "repetition_code": _setup_repetition_code,
+        "surface_code": _setup_surface_code,
+        "hypergraph_product_code": _setup_hypergraph_product_code,
+    }
 
     # ------------------------------------ Setters and Getters ------------------------------------
 
+    @property
+    def sampler(self) -> stim.CompiledMeasurementSampler:
+        """Compiled measurement sampler, cached until the circuit changes."""
+        if self._sampler is None:
+            self._sampler = self.circuit.compile_sampler()
+        return self._sampler
+
+    @property
+    def detector_sampler(self) -> stim.CompiledDetectorSampler:
+        """Compiled detector sampler, cached until the circuit changes."""
+        if self._detector_sampler is None:
+            self._detector_sampler = self.circuit.compile_detector_sampler()
+        return self._detector_sampler
+
     def reset_data_qubits(self) -> None:
         self.circuit.append("R", self.data_qubits)
+        self._sampler = None
+        self._detector_sampler = None
+
+    def shots(self, n: int, detector: bool = True) -> np.ndarray:
+        """Samples `n` shots in one batched call on the cached sampler.
+
+        With `detector=True`, returns a `(n, rounds + 1, checks)` array with one slice
+        per measurement round plus the final data-qubit comparison round. Otherwise
+        returns the raw measurement outcomes as an `(n, num_measurements)` array.
+        """
+
+        if detector:
+            packed = self.detector_sampler.sample(n, bit_packed=True)
+            samples = np.unpackbits(
+                packed, axis=1, bitorder="little", count=self.circuit.num_detectors
+            )
+            return samples.reshape(n, self.rounds + 1, -1)
+
+        packed = self.sampler.sample(n, bit_packed=True)
+        return np.unpackbits(
+            packed, axis=1, bitorder="little", count=self.circuit.num_measurements
+        )
 
     def crossing_number(self) -> int:
         return len(self.crossings)
@@ -195,7 +339,12 @@ class StabilizerModel:
     # -------------------------------------- Display Methods --------------------------------------
 
     def display_samples(self, shots: int = 1) -> None:
-        samples = self.circuit.compile_sampler().sample(shots)
+        # Sample bit-packed (1 bit per outcome instead of 1 byte) and unpack only the
+        # bits that are actually rendered.
+        packed = self.sampler.sample(shots, bit_packed=True)
+        samples = np.unpackbits(
+            packed, axis=1, bitorder="little", count=self.circuit.num_measurements
+        )
         for i, sample in enumerate(samples):
             round_list = []
             for j, outcome in enumerate(sample):
@@ -210,7 +359,13 @@ class StabilizerModel:
         print()
 
     def display_detector_samples(self, shots: int = 1) -> None:
-        samples = self.circuit.compile_detector_sampler().sample(shots, append_observables=True)
+        packed = self.detector_sampler.sample(shots, append_observables=True, bit_packed=True)
+        samples = np.unpackbits(
+            packed,
+            axis=1,
+            bitorder="little",
+            count=self.circuit.num_detectors + self.circuit.num_observables,
+        )
         for i, sample in enumerate(samples):
             round_list = []
             for j, outcome in enumerate(sample):
@@ -347,27 +502,10 @@ class StabilizerModel:
         return G
 
     def crossings(self) -> set[frozenset[tuple[int, int]]]:
-        def ccw(A, B, C):
-            return (C[1] - A[1]) * (B[0] - A[0]) > (B[1] - A[1]) * (C[0] - A[0])
-
-        def intersect(A, B, C, D):
-            return ccw(A, C, D) != ccw(B, C, D) and ccw(A, B, C) != ccw(A, B, D)
-
-        crossings = set()
         qubit_edges = [
             tuple(self.graph.nodes[node]["index"] for node in edge) for edge in self.graph.edges
         ]
-        for i in range(len(qubit_edges)):
-            for j in range(i + 1, len(qubit_edges)):
-                qubit_edge_1, qubit_edge_2 = qubit_edges[i], qubit_edges[j]
-                if qubit_edge_1[0] in qubit_edge_2 or qubit_edge_1[1] in qubit_edge_2:
-                    continue
-
-                pos1 = (self.pos[qubit_edge_1[0]], self.pos[qubit_edge_1[1]])
-                pos2 = (self.pos[qubit_edge_2[0]], self.pos[qubit_edge_2[1]])
-                if intersect(pos1[0], pos1[1], pos2[0], pos2[1]):
-                    crossings.add(frozenset({qubit_edge_1, qubit_edge_2}))
-        return crossings
+        return util.intersecting_edges(qubit_edges, self.pos)
 
     def pos_from_str(self):
         z_check_nodes = [
@@ -398,14 +536,22 @@ class StabilizerModel:
 
     def _hypergraph_product_code(self, experiment: str | None) -> None:
         self.circuit.append("R", self.qubits)
-        self.circuit.append("M", self.z_check_qubits + self.x_check_qubits)
+        self.circuit.append("M", np.concatenate([self.z_check_qubits, self.x_check_qubits]))
 
         circuit = stim.Circuit()
+
+        # Local bindings for the emission loops below; repeated attribute lookups on the
+        # circuit and the stim module add up over O(nnz) appends.
+        append = circuit.append
+        trec = stim.target_rec
+        num_data_qubits = len(self.data_qubits)
+        num_checks = len(self.z_check_qubits) + len(self.x_check_qubits)
+
         for target_qubit, z_pcm_row in zip(self.z_check_qubits, self.HZ):
             qubits = [self.data_qubits[i] for i, v in enumerate(z_pcm_row) if v]
             for z_logical_qubit in qubits:
-                circuit.append("CNOT", [z_logical_qubit, target_qubit])
-                circuit.append(
+                append("CNOT", [z_logical_qubit, target_qubit])
+                append(
                     "PAULI_CHANNEL_2", [z_logical_qubit, target_qubit], self.noise_circuit
                 )
 
@@ -413,41 +559,41 @@ class StabilizerModel:
             qubits = [self.data_qubits[i] for i, v in enumerate(x_pcm_row) if v]
             for x_logical_qubit in qubits:
                 # TODO: Experiment with taking Hadamard gates out of this loop, and/or using CZ gates.
-                circuit.append("H", [target_qubit])
-                circuit.append("CNOT", [target_qubit, x_logical_qubit])
-                circuit.append("H", [target_qubit])
-                circuit.append(
+                append("H", [target_qubit])
+                append("CNOT", [target_qubit, x_logical_qubit])
+                append("H", [target_qubit])
+                append(
                     "PAULI_CHANNEL_2", [x_logical_qubit, target_qubit], self.noise_circuit
                 )
 
         crossings = self.crossings()
         for crossing in crossings:
             for edge in crossing:
-                circuit.append("PAULI_CHANNEL_2", [edge[0], edge[1]], self.noise_crossing)
+                append("PAULI_CHANNEL_2", [edge[0], edge[1]], self.noise_crossing)
 
-        circuit.append("PAULI_CHANNEL_1", self.data_qubits, self.noise_data)
-        circuit.append("PAULI_CHANNEL_1", self.z_check_qubits, self.noise_z_check)
-        circuit.append("PAULI_CHANNEL_1", self.x_check_qubits, self.noise_x_check)
+        append("PAULI_CHANNEL_1", self.data_qubits, self.noise_data)
+        append("PAULI_CHANNEL_1", self.z_check_qubits, self.noise_z_check)
+        append("PAULI_CHANNEL_1", self.x_check_qubits, self.noise_x_check)
 
-        circuit.append("MR", self.z_check_qubits)
+        append("MR", self.z_check_qubits)
         if experiment == "z_memory":
             for k in range(len(self.z_check_qubits)):
-                circuit.append(
+                append(
                     "DETECTOR",
                     [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
+                        trec(-1 - k),
+                        trec(-1 - k - num_checks),
                     ],
                 )
-            circuit.append("MR", self.x_check_qubits)
+            append("MR", self.x_check_qubits)
         elif experiment == "x_memory":
-            circuit.append("MR", self.x_check_qubits)
+            append("MR", self.x_check_qubits)
             for k in range(len(self.x_check_qubits)):
-                circuit.append(
+                append(
                     "DETECTOR",
                     [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
+                        trec(-1 - k),
+                        trec(-1 - k - num_checks),
                     ],
                 )
         else:
@@ -461,18 +607,18 @@ class StabilizerModel:
                 z_pcm_row = self.HZ[-1 - k]
                 idx_qubits = [i for i, v in enumerate(z_pcm_row) if v]
                 lookback_records = [
-                    stim.target_rec(-1 - k - len(self.data_qubits + self.x_check_qubits))
+                    trec(-1 - k - num_data_qubits - len(self.x_check_qubits))
                 ]
                 for idx_qubit in idx_qubits:
-                    lookback_records.append(stim.target_rec(idx_qubit - len(self.data_qubits)))
+                    lookback_records.append(trec(idx_qubit - num_data_qubits))
                 self.circuit.append("DETECTOR", lookback_records)
         elif experiment == "x_memory":
             for k in range(len(self.x_check_qubits)):
                 x_pcm_row = self.HX[-1 - k]
                 idx_qubits = [i for i, v in enumerate(x_pcm_row) if v]
-                lookback_records = [stim.target_rec(-1 - k - len(self.data_qubits))]
+                lookback_records = [trec(-1 - k - num_data_qubits)]
                 for idx_qubit in idx_qubits:
-                    lookback_records.append(stim.target_rec(idx_qubit - len(self.data_qubits)))
+                    lookback_records.append(trec(idx_qubit - num_data_qubits))
                 self.circuit.append("DETECTOR", lookback_records)
 
         x_logicals, z_logicals = self.logicals()
@@ -486,276 +632,132 @@ class StabilizerModel:
                 self.logical = [self.logical]
             logicals_qubits = [logicals_qubits[i] for i in self.logical]
 
-        print(f"[{'Z' if experiment == 'z_memory' else 'X'} Logical Operators]")
-        print(f"Using {len(logicals_qubits)}/{original_logicals_length} logical operators:")
-        print(logicals_qubits, "\n")
+        # Serializing the operator lists to stdout on every construction dominates sweep
+        # runtime, so only print on request; the operators stay inspectable via logicals().
+        if self.code_params.get("verbose"):
+            print(f"[{'Z' if experiment == 'z_memory' else 'X'} Logical Operators]")
+            print(f"Using {len(logicals_qubits)}/{original_logicals_length} logical operators:")
+            print(logicals_qubits, "\n")
 
         for i, logical_qubits in enumerate(logicals_qubits):
             observable_lookback_indices = []
             for logical_qubit in logical_qubits:
                 observable_lookback_indices.append(
-                    stim.target_rec(logical_qubit - len(self.data_qubits))
+                    trec(logical_qubit - num_data_qubits)
                 )
             self.circuit.append("OBSERVABLE_INCLUDE", observable_lookback_indices, i)
 
     def _surface_code(self, experiment: str | None) -> None:
         self.circuit.append("R", self.qubits)
-        self.circuit.append("M", self.z_check_qubits + self.x_check_qubits)  # Maybe...
-
-        circuit = stim.Circuit()
-        for row in range(self.scale[0]):
-            for col in range(self.scale[1]):
-                curr_qubit = row * self.scale[1] + col
-                if row % 2 == 0 and col % 2 != 0:
-                    # Z check and boundary conditions.
-                    circuit.append("CNOT", [curr_qubit - 1, curr_qubit])
-                    circuit.append("CNOT", [curr_qubit + 1, curr_qubit])
-
-                    if row == 0:
-                        circuit.append("CNOT", [curr_qubit + self.scale[1], curr_qubit])
-                    elif row == self.scale[0] - 1:
-                        circuit.append("CNOT", [curr_qubit - self.scale[1], curr_qubit])
-                    else:
-                        circuit.append("CNOT", [curr_qubit - self.scale[1], curr_qubit])
-                        circuit.append("CNOT", [curr_qubit + self.scale[1], curr_qubit])
-
-                    # Gate noise.
-                    if self.noise_circuit is not None:
-                        circuit.append(
-                            "PAULI_CHANNEL_2", [curr_qubit - 1, curr_qubit], self.noise_circuit
-                        )
-                        circuit.append(
-                            "PAULI_CHANNEL_2", [curr_qubit + 1, curr_qubit], self.noise_circuit
-                        )
-                        if row == 0:
-                            circuit.append(
-                                "PAULI_CHANNEL_2",
-                                [curr_qubit + self.scale[1], curr_qubit],
-                                self.noise_circuit,
-                            )
-                        elif row == self.scale[0] - 1:
-                            circuit.append(
-                                "PAULI_CHANNEL_2",
-                                [curr_qubit - self.scale[1], curr_qubit],
-                                self.noise_circuit,
-                            )
-                        else:
-                            circuit.append(
-                                "PAULI_CHANNEL_2",
-                                [curr_qubit - self.scale[1], curr_qubit],
-                                self.noise_circuit,
-                            )
-                            circuit.append(
-                                "PAULI_CHANNEL_2",
-                                [curr_qubit + self.scale[1], curr_qubit],
-                                self.noise_circuit,
-                            )
-
-                elif row % 2 != 0 and col % 2 == 0:
-                    # X check and boundary conditions.
-                    circuit.append("H", [curr_qubit])
-
-                    circuit.append("CNOT", [curr_qubit, curr_qubit - self.scale[1]])
-                    circuit.append("CNOT", [curr_qubit, curr_qubit + self.scale[1]])
-                    if col == 0:
-                        circuit.append("CNOT", [curr_qubit, curr_qubit + 1])
-                    elif col == self.scale[1] - 1:
-                        circuit.append("CNOT", [curr_qubit, curr_qubit - 1])
-                    else:
-                        circuit.append("CNOT", [curr_qubit, curr_qubit - 1])
-                        circuit.append("CNOT", [curr_qubit, curr_qubit + 1])
-
-                    circuit.append("H", [curr_qubit])
-
-                    # Gate noise.
-                    if self.noise_circuit is not None:
-                        circuit.append(
-                            "PAULI_CHANNEL_2",
-                            [curr_qubit - self.scale[1], curr_qubit],
-                            self.noise_circuit,
-                        )
-                        circuit.append(
-                            "PAULI_CHANNEL_2",
-                            [curr_qubit + self.scale[1], curr_qubit],
-                            self.noise_circuit,
-                        )
-                        if col == 0:
-                            circuit.append(
-                                "PAULI_CHANNEL_2", [curr_qubit + 1, curr_qubit], self.noise_circuit
-                            )
-                        elif col == self.scale[1] - 1:
-                            circuit.append(
-                                "PAULI_CHANNEL_2", [curr_qubit - 1, curr_qubit], self.noise_circuit
-                            )
-                        else:
-                            circuit.append(
-                                "PAULI_CHANNEL_2", [curr_qubit - 1, curr_qubit], self.noise_circuit
-                            )
-                            circuit.append(
-                                "PAULI_CHANNEL_2", [curr_qubit + 1, curr_qubit], self.noise_circuit
-                            )
-
-        if self.noise_data is not None:
-            circuit.append("PAULI_CHANNEL_1", self.data_qubits, self.noise_data)
-        if self.noise_z_check is not None:
-            circuit.append("PAULI_CHANNEL_1", self.z_check_qubits, self.noise_z_check)
-        if self.noise_x_check is not None:
-            circuit.append("PAULI_CHANNEL_1", self.x_check_qubits, self.noise_x_check)
-
-        circuit.append("MR", self.z_check_qubits)
-        if experiment == "z_memory":
-            for k in range(len(self.z_check_qubits)):
-                circuit.append(
-                    "DETECTOR",
-                    [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
-                    ],
-                )
-            circuit.append("MR", self.x_check_qubits)
-        elif experiment == "x_memory":
-            circuit.append("MR", self.x_check_qubits)
-            for k in range(len(self.x_check_qubits)):
-                circuit.append(
-                    "DETECTOR",
-                    [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
-                    ],
-                )
-        elif experiment is None:
-            for k in range(len(self.z_check_qubits)):
-                circuit.append(
-                    "DETECTOR",
-                    [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
-                    ],
-                )
-
-            circuit.append("MR", self.x_check_qubits)
-            for k in range(len(self.x_check_qubits)):
-                circuit.append(
-                    "DETECTOR",
-                    [
-                        stim.target_rec(-1 - k),
-                        stim.target_rec(-1 - k - len(self.x_check_qubits + self.z_check_qubits)),
-                    ],
-                )
-        else:
-            raise ValueError(f"Experiment not recognized: '{experiment}'.")
+        self.circuit.append(
+            "M", np.concatenate([self.z_check_qubits, self.x_check_qubits])
+        )  # Maybe...
+
+        layer = _build_surface_layer(
+            self.scale,
+            self.noise_circuit,
+            self.noise_data,
+            self.noise_z_check,
+            self.noise_x_check,
+            experiment,
+        )
 
-        self.circuit += circuit * self.rounds
+        self.circuit += layer * self.rounds
         self.circuit.append("M", self.data_qubits)
 
         num_data_qubits_z = self.scale[1] // 2 + 1
         num_data_qubits_x = self.scale[1] // 2
-        row = 0
-        skip = 0
         if experiment == "z_memory":
-            for k in range(len(self.z_check_qubits)):
-                if k % num_data_qubits_x == 0 and k != 0:
-                    row += 2
-                    skip += num_data_qubits_z
-                lookback_records = [
-                    stim.target_rec(-1 - k - len(self.data_qubits + self.x_check_qubits)),
-                    stim.target_rec(-1 - k - skip),
-                    stim.target_rec(-2 - k - skip),
-                ]
-                if row == 0:
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                elif row == self.scale[0] - 1:
-                    lookback_records.append(stim.target_rec(-1 - k - skip + num_data_qubits_x))
-                else:
-                    lookback_records.append(stim.target_rec(-1 - k - skip + num_data_qubits_x))
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                self.circuit.append("DETECTOR", lookback_records)
+            self._surface_final_z_detectors()
         elif experiment == "x_memory":
-            for k in range(len(self.x_check_qubits)):
-                lookback_records = []
-                if k % num_data_qubits_z == 0:
-                    if k != 0:
-                        skip += num_data_qubits_x
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                elif k % num_data_qubits_z == num_data_qubits_z - 1:
-                    lookback_records.append(stim.target_rec(-1 - k - skip - num_data_qubits_x))
-                else:
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                    lookback_records.append(stim.target_rec(-1 - k - skip - num_data_qubits_x))
-
-                lookback_records += [
-                    stim.target_rec(-1 - k - len(self.data_qubits + self.x_check_qubits)),
-                    stim.target_rec(-1 - k - skip),
-                    stim.target_rec(-2 - k - skip),
-                ]
-                self.circuit.append("DETECTOR", lookback_records)
+            self._surface_final_x_detectors()
         elif experiment is None:
             # TODO: Start here for x and z experiment combined. See why this does not work.
-            for k in range(len(self.z_check_qubits)):
-                if k % num_data_qubits_x == 0 and k != 0:
-                    row += 2
-                    skip += num_data_qubits_z
-                lookback_records = [
-                    stim.target_rec(-1 - k - len(self.data_qubits + self.x_check_qubits)),
-                    stim.target_rec(-1 - k - skip),
-                    stim.target_rec(-2 - k - skip),
-                ]
-                if row == 0:
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                elif row == self.scale[0] - 1:
-                    lookback_records.append(stim.target_rec(-1 - k - skip + num_data_qubits_x))
-                else:
-                    lookback_records.append(stim.target_rec(-1 - k - skip + num_data_qubits_x))
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                self.circuit.append("DETECTOR", lookback_records)
-
-            for k in range(len(self.x_check_qubits)):
-                lookback_records = []
-                if k % num_data_qubits_z == 0:
-                    if k != 0:
-                        skip += num_data_qubits_x
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                elif k % num_data_qubits_z == num_data_qubits_z - 1:
-                    lookback_records.append(stim.target_rec(-1 - k - skip - num_data_qubits_x))
-                else:
-                    lookback_records.append(stim.target_rec(-2 - k - skip - num_data_qubits_x))
-                    lookback_records.append(stim.target_rec(-1 - k - skip - num_data_qubits_x))
-
-                lookback_records += [
-                    stim.target_rec(-1 - k - len(self.data_qubits + self.x_check_qubits)),
-                    stim.target_rec(-1 - k - skip),
-                    stim.target_rec(-2 - k - skip),
-                ]
-                self.circuit.append("DETECTOR", lookback_records)
+            final_z_skip = self._surface_final_z_detectors()
+            self._surface_final_x_detectors(skip_offset=final_z_skip)
 
+        trec = stim.target_rec
         observable_lookback_indices = []
         if experiment == "z_memory":
             for k in range(self.scale[0] // 2 + 1):
                 observable_lookback_indices.append(
-                    stim.target_rec(
-                        -k * (num_data_qubits_z + num_data_qubits_x) - num_data_qubits_z
-                    )
+                    trec(-k * (num_data_qubits_z + num_data_qubits_x) - num_data_qubits_z)
                 )
             self.circuit.append("OBSERVABLE_INCLUDE", observable_lookback_indices, 0)
         elif experiment == "x_memory":
-            observable_lookback_indices = [
-                stim.target_rec(-1 - k) for k in range(num_data_qubits_z)
-            ]
+            observable_lookback_indices = [trec(-1 - k) for k in range(num_data_qubits_z)]
             self.circuit.append("OBSERVABLE_INCLUDE", observable_lookback_indices, 0)
         elif experiment is None:
             z_observable_lookback_indices = []
             for k in range(self.scale[0] // 2 + 1):
                 z_observable_lookback_indices.append(
-                    stim.target_rec(
-                        -k * (num_data_qubits_z + num_data_qubits_x) - num_data_qubits_z
-                    )
+                    trec(-k * (num_data_qubits_z + num_data_qubits_x) - num_data_qubits_z)
                 )
-            x_observable_lookback_indices = [
-                stim.target_rec(-1 - k) for k in range(num_data_qubits_z)
-            ]
+            x_observable_lookback_indices = [trec(-1 - k) for k in range(num_data_qubits_z)]
             self.circuit.append("OBSERVABLE_INCLUDE", z_observable_lookback_indices, 0)
             self.circuit.append("OBSERVABLE_INCLUDE", x_observable_lookback_indices, 1)
 
+    def _surface_final_z_detectors(self) -> int:
+        """Emits the data-measurement detectors of the Z checks; returns the final row skip."""
+
+        num_data_qubits_z = self.scale[1] // 2 + 1
+        num_data_qubits_x = self.scale[1] // 2
+        trec = stim.target_rec
+        measure_base = len(self.data_qubits) + len(self.x_check_qubits)
+
+        # The running row/skip counters are plain integer arithmetic in k, so precompute
+        # them instead of mutating state inside the loop.
+        k_arr = np.arange(len(self.z_check_qubits))
+        row_arr = 2 * (k_arr // num_data_qubits_x)
+        skip_arr = num_data_qubits_z * (k_arr // num_data_qubits_x)
+
+        append = self.circuit.append
+        for k, row, skip in zip(k_arr.tolist(), row_arr.tolist(), skip_arr.tolist()):
+            lookback_records = [
+                trec(-1 - k - measure_base),
+                trec(-1 - k - skip),
+                trec(-2 - k - skip),
+            ]
+            if row == 0:
+                lookback_records.append(trec(-2 - k - skip - num_data_qubits_x))
+            elif row == self.scale[0] - 1:
+                lookback_records.append(trec(-1 - k - skip + num_data_qubits_x))
+            else:
+                lookback_records.append(trec(-1 - k - skip + num_data_qubits_x))
+                lookback_records.append(trec(-2 - k - skip - num_data_qubits_x))
+            append("DETECTOR", lookback_records)
+
+        return int(skip_arr[-1]) if len(skip_arr) else 0
+
+    def _surface_final_x_detectors(self, skip_offset: int = 0) -> None:
+        """Emits the data-measurement detectors of the X checks."""
+
+        num_data_qubits_z = self.scale[1] // 2 + 1
+        num_data_qubits_x = self.scale[1] // 2
+        trec = stim.target_rec
+        measure_base = len(self.data_qubits) + len(self.x_check_qubits)
+
+        k_arr = np.arange(len(self.x_check_qubits))
+        skip_arr = skip_offset + num_data_qubits_x * (k_arr // num_data_qubits_z)
+
+        append = self.circuit.append
+        for k, skip in zip(k_arr.tolist(), skip_arr.tolist()):
+            lookback_records = []
+            if k % num_data_qubits_z == 0:
+                lookback_records.append(trec(-2 - k - skip - num_data_qubits_x))
+            elif k % num_data_qubits_z == num_data_qubits_z - 1:
+                lookback_records.append(trec(-1 - k - skip - num_data_qubits_x))
+            else:
+                lookback_records.append(trec(-2 - k - skip - num_data_qubits_x))
+                lookback_records.append(trec(-1 - k - skip - num_data_qubits_x))
+
+            lookback_records += [
+                trec(-1 - k - measure_base),
+                trec(-1 - k - skip),
+                trec(-2 - k - skip),
+            ]
+            append("DETECTOR", lookback_records)
+
     def _repetition_code(self) -> None:
         # We have to add initial dummy measurements for the detector to detect change in the first
         # set of qubit measurements.
@@ -763,13 +765,21 @@ class StabilizerModel:
 
         circuit = stim.Circuit()
 
-        # Stabilizer measurements.
-        for m in self.z_check_qubits:
-            circuit.append("CNOT", [m - 1, m])
-            circuit.append("CNOT", [m + 1, m])
-            if self.noise_circuit is not None:
-                circuit.append("PAULI_CHANNEL_2", [m - 1, m], self.noise_circuit)
-                circuit.append("PAULI_CHANNEL_2", [m + 1, m], self.noise_circuit)
+        # Stabilizer measurements, emitted as one append per gate layer with flat
+        # [control, target, ...] lists instead of one append per check qubit.
+        m = self.z_check_qubits
+        cnot_left = np.empty(2 * len(m), dtype=int)
+        cnot_left[0::2] = m - 1
+        cnot_left[1::2] = m
+        cnot_right = np.empty(2 * len(m), dtype=int)
+        cnot_right[0::2] = m + 1
+        cnot_right[1::2] = m
+
+        circuit.append("CNOT", cnot_left.tolist())
+        circuit.append("CNOT", cnot_right.tolist())
+        if self.noise_circuit is not None:
+            circuit.append("PAULI_CHANNEL_2", cnot_left.tolist(), self.noise_circuit)
+            circuit.append("PAULI_CHANNEL_2", cnot_right.tolist(), self.noise_circuit)
 
         # Apply random errors on qubits.
         if self.noise_data is not None:
@@ -781,25 +791,21 @@ class StabilizerModel:
         circuit.append("MR", self.z_check_qubits)
 
         # Compare the last measurement result to the one previous to that of the same qubit.
+        trec = stim.target_rec
         for k in range(len(self.z_check_qubits)):
-            circuit.append(
-                "DETECTOR", [stim.target_rec(-1 - k), stim.target_rec(-1 - k - self.distance)]
-            )
+            circuit.append("DETECTOR", [trec(-1 - k), trec(-1 - k - self.distance)])
 
         # Concatenate the circuits.
         self.circuit += circuit * self.rounds
 
         # Measure data qubits at the end.
         self.circuit.append("M", self.data_qubits)
+        main_append = self.circuit.append
         for k in range(len(self.z_check_qubits)):
-            self.circuit.append(
+            main_append(
                 "DETECTOR",
-                [
-                    stim.target_rec(-1 - k),
-                    stim.target_rec(-2 - k),
-                    stim.target_rec(-2 - k - self.distance),
-                ],
+                [trec(-1 - k), trec(-2 - k), trec(-2 - k - self.distance)],
             )
 
         # Add observable.
-        self.circuit.append("OBSERVABLE_INCLUDE", [stim.target_rec(-1)], 0)
+        self.circuit.append("OBSERVABLE_INCLUDE", [trec(-1)], 0)
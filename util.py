@@ -2,12 +2,23 @@ from itertools import combinations
 
 import matplotlib.pyplot as plt
 import numpy as np
+import scipy.sparse as sp
 
 from ldpc import mod2
 
+# Numba is an optional accelerator: without it the NumPy path below is used for all sizes.
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Edge count above which the pairwise intersection test dispatches to the Numba kernel,
+# which avoids the O(E^2) pair temporaries of the vectorized path.
+NUMBA_EDGE_THRESHOLD = 500
+
 
 def generate_rep_pcm(n: int) -> np.ndarray:
-    H = np.zeros((n - 1, n), dtype=int)
+    H = np.zeros((n - 1, n), dtype=np.uint8)
     np.fill_diagonal(H, 1)
     H[:, -1] = 1
 
@@ -19,7 +30,7 @@ def generate_hamming_pcm(n: int) -> np.ndarray:
     if 2**m - 1 != n:
         raise ValueError("Invalid n for a Hamming code. Ensure n = 2^m - 1.")
 
-    H = np.zeros((m, n), dtype=int)
+    H = np.zeros((m, n), dtype=np.uint8)
     for i in range(1, n + 1):
         binary_str = format(i, f"0{m}b")[::-1]
         H[:, i - 1] = [int(bit) for bit in binary_str]
@@ -41,52 +52,188 @@ def pcm_to_clist(H: np.ndarray) -> list:
 def hypergraph_pcm(
     H1: np.ndarray, H2: np.ndarray, reordered: bool = True
 ) -> tuple[np.ndarray, np.ndarray]:
+    H1 = sp.csr_matrix(H1, dtype=np.uint8)
+    H2 = sp.csr_matrix(H2, dtype=np.uint8)
+
     r1, n1 = H1.shape
     r2, n2 = H2.shape
 
-    HX_left = np.kron(H1, np.eye(n2))
-    HX_right = np.kron(np.eye(r1), H2.T)
-    HX = np.append(HX_left, HX_right, axis=1)
-
-    HZ_left = np.kron(np.eye(n1), H2)
-    HZ_right = np.kron(H1.T, np.eye(r2))
-    HZ = np.append(HZ_left, HZ_right, axis=1)
+    HX = sp.hstack(
+        [
+            sp.kron(H1, sp.eye(n2, dtype=np.uint8, format="csr")),
+            sp.kron(sp.eye(r1, dtype=np.uint8, format="csr"), H2.T),
+        ],
+        format="csc",
+    )
+    HZ = sp.hstack(
+        [
+            sp.kron(sp.eye(n1, dtype=np.uint8, format="csr"), H2),
+            sp.kron(H1.T, sp.eye(r2, dtype=np.uint8, format="csr")),
+        ],
+        format="csc",
+    )
 
     if reordered:
-        HX_left_split = np.split(HX_left, n1, axis=1)
-        HX_right_split = np.split(HX_right, r1, axis=1)
-        HX_split = []
+        # Interleave the left blocks (width n2) with the right blocks (width r2), as a
+        # single column permutation instead of split/concatenate round-trips.
+        perm = []
         for i in range(n1):
-            HX_split.append(HX_left_split[i])
+            perm.append(np.arange(i * n2, (i + 1) * n2))
             if i < r1:
-                HX_split.append(HX_right_split[i])
-        HX = np.concatenate(tuple(HX_split), axis=1)
+                perm.append(n1 * n2 + np.arange(i * r2, (i + 1) * r2))
+        perm = np.concatenate(perm)
+        HX = HX[:, perm]
+        HZ = HZ[:, perm]
 
-        HZ_left_split = np.split(HZ_left, n1, axis=1)
-        HZ_right_split = np.split(HZ_right, r1, axis=1)
-        HZ_split = []
-        for i in range(n1):
-            HZ_split.append(HZ_left_split[i])
-            if i < r1:
-                HZ_split.append(HZ_right_split[i])
-        HZ = np.concatenate(tuple(HZ_split), axis=1)
+    # sp.kron promotes to float64 when a factor has zero nnz, so pin the dtype before
+    # densifying straight into preallocated uint8 output instead of toarray().astype(int),
+    # which would allocate and copy twice at 8 bytes per bit.
+    HX = HX.astype(np.uint8, copy=False)
+    HZ = HZ.astype(np.uint8, copy=False)
+    HX_dense = np.zeros(HX.shape, dtype=np.uint8)
+    HZ_dense = np.zeros(HZ.shape, dtype=np.uint8)
+    HX.toarray(out=HX_dense)
+    HZ.toarray(out=HZ_dense)
 
-    return HX.astype(int), HZ.astype(int)
+    return HX_dense, HZ_dense
 
 
 def classical_pcm(clist: list) -> np.ndarray:
     num_bits = clist.count("B")
-    H = []
-    for i in range(len(clist)):
-        if clist[i] == "C":
-            peak_i = i + 1
-            one_hot_vec = np.zeros(num_bits)
-            while peak_i < len(clist) and type(clist[peak_i]) != str:
-                one_hot_vec[clist[peak_i]] = 1
-                peak_i += 1
-            H.append(one_hot_vec)
-
-    return np.array(H, dtype=int)
+
+    is_symbol = np.fromiter((isinstance(x, str) for x in clist), dtype=bool, count=len(clist))
+    check_starts = np.where(
+        np.fromiter((x == "C" for x in clist), dtype=bool, count=len(clist))
+    )[0]
+
+    # Every bit index belongs to the closest "C" marker before it, so the row of each
+    # index is just its position searched against the marker positions.
+    bit_positions = np.where(~is_symbol)[0]
+    rows = np.searchsorted(check_starts, bit_positions) - 1
+    cols = np.fromiter((clist[p] for p in bit_positions), dtype=np.intp, count=len(bit_positions))
+
+    H = np.zeros((len(check_starts), num_bits), dtype=np.uint8)
+    H[rows, cols] = 1
+
+    return H
+
+
+def pack_pcm(H: np.ndarray) -> np.ndarray:
+    """Packs the rows of a binary matrix into little-endian `uint64` words.
+
+    Columns are zero-padded to a multiple of 64, so bit `j` of row `i` lives in word
+    `j // 64` at bit position `j % 64`. XOR/AND row operations on the packed form touch
+    64 bits per instruction instead of one byte per bit.
+    """
+
+    H = np.ascontiguousarray(H, dtype=np.uint8)
+    pad = -H.shape[1] % 64
+    if pad:
+        H = np.pad(H, ((0, 0), (0, pad)))
+
+    return np.packbits(H, axis=1, bitorder="little").view(np.uint64)
+
+
+def packed_row_weights(H_packed: np.ndarray) -> np.ndarray:
+    """Returns the Hamming weight of each packed row produced by `pack_pcm`."""
+
+    # numpy >= 2 exposes a native popcount; fall back to unpacking on older versions.
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(H_packed).sum(axis=1, dtype=np.int64)
+    return np.unpackbits(H_packed.view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True, fastmath=True)
+    def _find_intersections(edge_arr: np.ndarray, pos_arr: np.ndarray) -> np.ndarray:
+        """Pairwise CCW intersection test returning a condensed upper-triangular mask."""
+
+        num_edges = edge_arr.shape[0]
+        mask = np.zeros(num_edges * (num_edges - 1) // 2, dtype=np.bool_)
+        for i in prange(num_edges):
+            a0, a1 = edge_arr[i, 0], edge_arr[i, 1]
+            ax0, ay0 = pos_arr[a0, 0], pos_arr[a0, 1]
+            ax1, ay1 = pos_arr[a1, 0], pos_arr[a1, 1]
+            base = num_edges * i - i * (i + 1) // 2 - i - 1
+            for j in range(i + 1, num_edges):
+                b0, b1 = edge_arr[j, 0], edge_arr[j, 1]
+                if a0 == b0 or a0 == b1 or a1 == b0 or a1 == b1:
+                    continue
+                cx0, cy0 = pos_arr[b0, 0], pos_arr[b0, 1]
+                cx1, cy1 = pos_arr[b1, 0], pos_arr[b1, 1]
+
+                ccw_acd = (cy1 - ay0) * (cx0 - ax0) > (cy0 - ay0) * (cx1 - ax0)
+                ccw_bcd = (cy1 - ay1) * (cx0 - ax1) > (cy0 - ay1) * (cx1 - ax1)
+                ccw_abc = (cy0 - ay0) * (ax1 - ax0) > (ay1 - ay0) * (cx0 - ax0)
+                ccw_abd = (cy1 - ay0) * (ax1 - ax0) > (ay1 - ay0) * (cx1 - ax0)
+                mask[base + j] = ccw_acd != ccw_bcd and ccw_abc != ccw_abd
+
+        return mask
+
+else:
+    _find_intersections = None
+
+
+def intersecting_edges_array(
+    edges: list[tuple[int, int]], positions: list[tuple[float, float]]
+) -> np.ndarray:
+    """Finds all pairs of edges whose segments cross, excluding pairs that share a node.
+
+    Returns an (M, 2) `int32` array of indices into `edges`, one row per crossing pair.
+    """
+
+    if len(edges) < 2:
+        return np.empty((0, 2), dtype=np.int32)
+
+    edge_arr = np.asarray(edges, dtype=np.int32)
+    pos_arr = np.asarray(positions, dtype=np.float64)
+    num_edges = len(edges)
+
+    if _find_intersections is not None and num_edges > NUMBA_EDGE_THRESHOLD:
+        # Recover (i, j) from the condensed mask positions instead of materializing the
+        # full O(E^2) triu index arrays the kernel exists to avoid: row i of the upper
+        # triangle starts at condensed offset i * (2E - i - 1) / 2.
+        hits = np.flatnonzero(_find_intersections(edge_arr, pos_arr))
+        rows = np.arange(num_edges - 1, dtype=np.int64)
+        row_starts = rows * (2 * num_edges - rows - 1) // 2
+        I = np.searchsorted(row_starts, hits, side="right") - 1
+        J = hits - row_starts[I] + I + 1
+        return np.stack([I, J], axis=1).astype(np.int32, copy=False)
+
+    I, J = np.triu_indices(num_edges, k=1)
+
+    # Segment endpoints of every edge pair, as (num_pairs, 2) coordinate arrays.
+    pts = pos_arr[edge_arr]
+    A, B = pts[I, 0], pts[I, 1]
+    C, D = pts[J, 0], pts[J, 1]
+
+    def ccw(P, Q, R):
+        return (R[:, 1] - P[:, 1]) * (Q[:, 0] - P[:, 0]) > (Q[:, 1] - P[:, 1]) * (
+            R[:, 0] - P[:, 0]
+        )
+
+    mask = (ccw(A, C, D) != ccw(B, C, D)) & (ccw(A, B, C) != ccw(A, B, D))
+    shared = (
+        (edge_arr[I, 0] == edge_arr[J, 0])
+        | (edge_arr[I, 0] == edge_arr[J, 1])
+        | (edge_arr[I, 1] == edge_arr[J, 0])
+        | (edge_arr[I, 1] == edge_arr[J, 1])
+    )
+    mask &= ~shared
+
+    return np.stack([I[mask], J[mask]], axis=1).astype(np.int32, copy=False)
+
+
+def intersecting_edges(
+    edges: list[tuple[int, int]], positions: list[tuple[float, float]]
+) -> set[frozenset[tuple[int, int]]]:
+    """Set-of-frozensets view of `intersecting_edges_array`, keyed by the edges themselves."""
+
+    return {
+        frozenset({edges[i], edges[j]})
+        for i, j in intersecting_edges_array(edges, positions)
+    }
 
 
 def find_pivot_columns(matrix: np.ndarray) -> list[int]: